@@ -1,18 +1,25 @@
 import numpy as np
 
 
+def _normalize(mat):
+    mat = np.ascontiguousarray(mat, dtype=np.float32)
+    return mat / (np.linalg.norm(mat, axis=-1, keepdims=True) + 1e-12)
+
+
 class SimpleKNNClassifier:
     """
     Very small KNN classifier using the HuggingFaceEmbeddings interface.
     """
 
-    def __init__(self, seed_examples: dict, emb_model):
+    def __init__(self, seed_examples: dict, emb_model, prototypes: bool = False):
         """
         seed_examples = {
             "insurance": ["what is insurance", "benefits", ...],
             "other": [...],
         }
         emb_model = HuggingFaceEmbeddings
+        prototypes = True collapses each label to the normalised mean of its
+                     examples, so cost scales with #labels instead of #examples
         """
 
         self.emb_model = emb_model
@@ -25,16 +32,73 @@ class SimpleKNNClassifier:
                 self.labels.append(label)
                 self.embeddings.append(e)
 
-        self.embeddings = np.array(self.embeddings)
+        self._fit(np.array(self.embeddings), prototypes)
+
+    def _fit(self, embeddings, prototypes):
+        # rows are unit length, so cosine similarity is a single matmul
+        embeddings = _normalize(embeddings)
+        if prototypes:
+            names = list(dict.fromkeys(self.labels))
+            label_arr = np.array(self.labels)
+            embeddings = _normalize(
+                np.stack([embeddings[label_arr == n].mean(axis=0) for n in names])
+            )
+            self.labels = names
+        self.prototypes = prototypes
+        self.embeddings = embeddings
+        self._label_arr = np.array(self.labels, dtype=object)
+
+    def _topk(self, sims, k):
+        # sims: (n_queries, n_seeds) -> per-row [(label, score)] best first
+        k = min(k, sims.shape[1])
+        if k <= 0:
+            return [[] for _ in range(len(sims))]
+        idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(sims, idx, axis=1)
+        order = np.argsort(-top, axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return [
+            list(zip(self._label_arr[row_idx].tolist(), row_sims.tolist()))
+            for row_idx, row_sims in zip(idx, top)
+        ]
 
     def predict_topk(self, query: str, k=2):
-        q_emb = np.array(self.emb_model.embed_query(query))
+        q_emb = _normalize(self.emb_model.embed_query(query))
+        return self._topk((self.embeddings @ q_emb)[None, :], k)[0]
 
-        sims = (self.embeddings @ q_emb) / (
-            np.linalg.norm(self.embeddings, axis=1) * (np.linalg.norm(q_emb) + 1e-12)
-        )
+    def predict_topk_many(self, queries, k=2):
+        """
+        Batch version of predict_topk: queries are embedded with embed_query,
+        exactly like predict_topk (models such as BGE/E5 prefix queries
+        differently from documents), then scored with a single matmul.
+        """
+        if not queries:
+            return []
+        q_embs = _normalize([self.emb_model.embed_query(q) for q in queries])
+        return self._topk(q_embs @ self.embeddings.T, k)
+
+    def save(self, path: str):
+        """
+        Persist the fitted matrix and labels (np.savez format) so restarts skip
+        re-embedding. Written to `path` exactly as given (no ".npz" is added),
+        so the same path can be handed to load().
+        """
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                embeddings=self.embeddings,
+                labels=np.array(self.labels),
+                prototypes=np.array(self.prototypes),
+            )
 
-        ranked = sorted(
-            zip(self.labels, sims.tolist()), key=lambda x: x[1], reverse=True
-        )
-        return ranked[:k]
+    @classmethod
+    def load(cls, path: str, emb_model):
+        with np.load(path, allow_pickle=False) as data:
+            clf = cls.__new__(cls)
+            clf.emb_model = emb_model
+            clf.labels = data["labels"].tolist()
+            clf.prototypes = bool(data["prototypes"])
+            clf.embeddings = np.ascontiguousarray(data["embeddings"], dtype=np.float32)
+        clf._label_arr = np.array(clf.labels, dtype=object)
+        return clf
@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "health insurance cover premium claim policy employee benefit plan hospital "
+    "wellness teleconsultation network cashless family member renewal startup"
+).split()
+
+
+class FakeSite:
+    """
+    Local stand-in for a customer website: /sitemap_index.xml -> nested
+    sitemaps -> /page/<i> HTML pages. Page count, page size, per-request
+    latency and the share of 429 responses are configurable, and the
+    content is seeded so every run serves identical bytes.
+    """
+
+    def __init__(self, pages=200, page_kb=8, latency_ms=0.0, rate_429=0.0,
+                 urls_per_sitemap=50, seed=0, host="127.0.0.1", port=0):
+        self.pages = pages
+        self.page_kb = page_kb
+        self.latency_ms = latency_ms
+        self.rate_429 = rate_429
+        self.urls_per_sitemap = urls_per_sitemap
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sitemap_url(self):
+        return f"{self.base_url}/sitemap_index.xml"
+
+    # ----------------------------
+    # Content
+    # ----------------------------
+    def _sitemap_index(self) -> str:
+        n = (self.pages + self.urls_per_sitemap - 1) // self.urls_per_sitemap
+        locs = "".join(f"<sitemap><loc>{self.base_url}/sitemap-{i}.xml</loc></sitemap>" for i in range(n))
+        return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex>{locs}</sitemapindex>'
+
+    def _sitemap(self, i: int) -> str:
+        start = i * self.urls_per_sitemap
+        stop = min(start + self.urls_per_sitemap, self.pages)
+        locs = "".join(f"<url><loc>{self.base_url}/page/{p}</loc></url>" for p in range(start, stop))
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset>{locs}</urlset>'
+
+    def page_text(self, i: int) -> str:
+        rng = random.Random(self.seed * 1_000_003 + i)
+        target = self.page_kb * 1024
+        paras, size = [], 0
+        while size < target:
+            p = " ".join(rng.choice(WORDS) for _ in range(60))
+            paras.append(p)
+            size += len(p)
+        return "\n".join(paras)
+
+    def _page(self, i: int) -> str:
+        body = "".join(f"<p>{p}</p>" for p in self.page_text(i).split("\n"))
+        return (
+            f"<html><head><title>Page {i}</title><script>var x = 1;</script></head>"
+            f"<body><nav>menu</nav><h1>Page {i}</h1>{body}<footer>footer</footer></body></html>"
+        )
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with site._rng_lock:
+                    site.requests += 1
+                    throttle = site._rng.random() < site.rate_429
+                    if throttle:
+                        site.throttled += 1
+                if site.latency_ms:
+                    time.sleep(site.latency_ms / 1000.0)
+                if throttle:
+                    self._send(429, "text/plain", "slow down")
+                    return
+
+                path = self.path.split("?")[0]
+                if path == "/sitemap_index.xml":
+                    self._send(200, "application/xml", site._sitemap_index())
+                elif path.startswith("/sitemap-") and path.endswith(".xml"):
+                    self._send(200, "application/xml", site._sitemap(int(path[len("/sitemap-"):-4])))
+                elif path.startswith("/page/"):
+                    self._send(200, "text/html; charset=utf-8", site._page(int(path[len("/page/"):])))
+                else:
+                    self._send(404, "text/plain", "not found")
+
+            def _send(self, status, ctype, text):
+                body = text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
@@ -0,0 +1,307 @@
+"""
+Offline benchmark harness for the crawl, ingest and query paths.
+
+Everything runs locally: a FakeSite serves the sitemap, documents are
+generated into a temp folder, embeddings default to a deterministic fake
+and the LLM is a stub, so results only move when our code does.
+
+    python -m benchmarks.run_benchmarks --pages 300 --latency-ms 20 --rate-429 0.05 --out bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from agent.classifier import SimpleKNNClassifier
+from benchmarks.fake_site import WORDS, FakeSite
+from channels.folder_channel import FolderChannel
+from embeddings.factory import make_embeddings
+from channels.sitemap_channel import SitemapChannel
+from ingestion.ingestion_manager import IngestionManager
+from ui.streamlit_app import CLASSIFIER_SEEDS, generate_answer, rerank_by_embedding, search_kb_first
+from utils import metrics
+from vector.chroma_manager import ChromaManager
+from vector.memory_index import benchmark_vs_chroma
+
+
+QUERIES = [
+    "what does the health insurance plan cover",
+    "how do I file a cashless claim",
+    "premium for family members",
+    "who built this bot",
+    "employee wellness benefits",
+    "teleconsultation network hospitals",
+    "policy renewal process",
+    "hello",
+]
+
+
+class FakeLLM:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+
+    def chat(self, system_msg: str, user_msg: str):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return f"stub answer ({len(user_msg)} chars of context)"
+
+
+def _percentiles(samples_ms):
+    if not samples_ms:
+        return {}
+    arr = np.asarray(samples_ms)
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "mean": float(arr.mean()),
+    }
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+# ----------------------------
+# Synthetic local documents
+# ----------------------------
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: str, pages):
+    """Write a minimal uncompressed PDF: one Helvetica text stream per page."""
+    n = len(pages)
+    font_id = 3 + 2 * n
+    objs = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(n)), n),
+    ]
+    for i, lines in enumerate(pages):
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objs.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_folder(folder: str, n_txt: int, n_pdf: int, pdf_pages: int, seed: int):
+    rng = random.Random(seed)
+
+    def line():
+        return " ".join(rng.choice(WORDS) for _ in range(12))
+
+    os.makedirs(folder, exist_ok=True)
+    for i in range(n_txt):
+        with open(os.path.join(folder, f"doc_{i}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(line() for _ in range(200)))
+    for i in range(n_pdf):
+        write_text_pdf(
+            os.path.join(folder, f"doc_{i}.pdf"),
+            [[line() for _ in range(60)] for _ in range(pdf_pages)],
+        )
+
+
+# ----------------------------
+# Benchmarks
+# ----------------------------
+def _sitemap_channel(site: FakeSite, args):
+    return SitemapChannel(
+        site.sitemap_url,
+        max_pages=args.pages,
+        concurrency=args.concurrency,
+        enable_playwright_fallback=False,
+        enable_tlsclient_fallback=False,
+    )
+
+
+def bench_crawl(site: FakeSite, args) -> dict:
+    channel = _sitemap_channel(site, args)
+    before = site.requests
+    t0 = time.perf_counter()
+    docs = channel.load_documents()
+    elapsed = time.perf_counter() - t0
+    return {
+        "pages_requested": args.pages,
+        "docs": len(docs),
+        "seconds": elapsed,
+        "pages_per_s": len(docs) / elapsed if elapsed else 0.0,
+        "http_requests": site.requests - before,
+    }
+
+
+def bench_folder(folder: str) -> dict:
+    t0 = time.perf_counter()
+    docs = FolderChannel(folder).load_documents()
+    elapsed = time.perf_counter() - t0
+    return {
+        "docs": len(docs),
+        "seconds": elapsed,
+        "docs_per_s": len(docs) / elapsed if elapsed else 0.0,
+    }
+
+
+def bench_ingest(site: FakeSite, folder: str, db_dir: str, emb, args):
+    chroma = ChromaManager(db_dir, emb, memory_index_dtype=args.memory_index or None)
+    ingestion = IngestionManager(
+        [_sitemap_channel(site, args), FolderChannel(folder)], chroma, retriever_k=args.k
+    )
+
+    t0 = time.perf_counter()
+    retriever = ingestion.ingest_all()
+    elapsed = time.perf_counter() - t0
+
+    # each loaded document is stored as one record, so records == chunks
+    chunks = chroma.store._collection.count()
+    return chroma, retriever, {
+        "chunks": chunks,
+        "seconds": elapsed,
+        "chunks_per_s": chunks / elapsed if elapsed else 0.0,
+        "index": args.memory_index or "chroma",
+    }
+
+
+def bench_query(chroma, retriever, emb, args) -> dict:
+    classifier = SimpleKNNClassifier(CLASSIFIER_SEEDS, emb)
+    llm = FakeLLM(args.llm_latency_ms)
+    stages = {"classify": [], "retrieve": [], "rerank": [], "llm": [], "total": []}
+
+    for i in range(args.warmup + args.queries):
+        query = QUERIES[i % len(QUERIES)]
+        t_start = time.perf_counter()
+
+        t0 = time.perf_counter()
+        classifier.predict_topk(query, k=1)
+        t1 = time.perf_counter()
+        docs = retriever.invoke(query)
+        kb_docs, forced = search_kb_first(query, emb, chroma)
+        t2 = time.perf_counter()
+        top_docs = kb_docs[:3] if forced and kb_docs else rerank_by_embedding(query, docs, emb)[0]
+        t3 = time.perf_counter()
+        generate_answer(llm, query, top_docs)
+        t4 = time.perf_counter()
+
+        if i < args.warmup:
+            continue
+        stages["classify"].append((t1 - t0) * 1000)
+        stages["retrieve"].append((t2 - t1) * 1000)
+        stages["rerank"].append((t3 - t2) * 1000)
+        stages["llm"].append((t4 - t3) * 1000)
+        stages["total"].append((t4 - t_start) * 1000)
+
+    return {"queries": args.queries, "latency_ms": {k: _percentiles(v) for k, v in stages.items()}}
+
+
+def bench_index(chroma, args) -> dict:
+    """Recall@k and search latency of the memory index against Chroma on the same collection."""
+    rng = random.Random(args.seed)
+    queries = QUERIES + [" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(args.queries)]
+    return benchmark_vs_chroma(chroma.store, chroma.memory_index, queries, k=args.k)
+
+
+def run(args) -> dict:
+    metrics.enable(args.metrics)
+    emb = make_embeddings(args.embeddings)
+    if args.metrics:
+        emb = metrics.InstrumentedEmbeddings(emb)
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": vars(args),
+        }
+    }
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp, FakeSite(
+        pages=args.pages,
+        page_kb=args.page_kb,
+        latency_ms=args.latency_ms,
+        rate_429=args.rate_429,
+        seed=args.seed,
+    ) as site:
+        folder = os.path.join(tmp, "docs")
+        generate_folder(folder, args.txt_files, args.pdf_files, args.pdf_pages, args.seed)
+
+        results["crawl"] = bench_crawl(site, args)
+        results["folder"] = bench_folder(folder)
+        chroma, retriever, results["ingest"] = bench_ingest(site, folder, os.path.join(tmp, "chroma"), emb, args)
+        results["query"] = bench_query(chroma, retriever, emb, args)
+        if chroma.memory_index is not None:
+            results["index_vs_chroma"] = bench_index(chroma, args)
+        results["site"] = {"requests": site.requests, "throttled_429": site.throttled}
+
+    if args.metrics:
+        results["metrics"] = metrics.snapshot()
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--pages", type=int, default=200)
+    p.add_argument("--page-kb", type=int, default=8)
+    p.add_argument("--latency-ms", type=float, default=0.0, help="server-side delay per request")
+    p.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    p.add_argument("--concurrency", type=int, default=12)
+    p.add_argument("--txt-files", type=int, default=20)
+    p.add_argument("--pdf-files", type=int, default=10)
+    p.add_argument("--pdf-pages", type=int, default=5)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--warmup", type=int, default=10)
+    p.add_argument("--llm-latency-ms", type=float, default=0.0)
+    p.add_argument("--embeddings", choices=("fake", "hf"), default="fake")
+    p.add_argument("--memory-index", choices=("", "float32", "float16", "int8"), default="",
+                   help="serve queries from the memory index and report its recall@k vs Chroma")
+    p.add_argument("--k", type=int, default=8, help="retriever k for the query and index benchmarks")
+    p.add_argument("--metrics", action="store_true", help="include per-stage metrics snapshot")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="write JSON here instead of stdout")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
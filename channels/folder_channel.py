@@ -2,6 +2,7 @@ import glob, os, logging
 from typing import List
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_core.documents import Document
+from utils import metrics
 from .base import BaseChannel
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,8 @@ class FolderChannel(BaseChannel):
         docs = []
         for txt in glob.glob(os.path.join(self.folder_path, "*.txt")):
             try:
-                parts = TextLoader(txt).load()
+                with metrics.span("parse", source="txt"):
+                    parts = TextLoader(txt).load()
                 for p in parts:
                     md = p.metadata or {}
                     md.setdefault("source", os.path.basename(txt))
@@ -25,7 +27,8 @@ class FolderChannel(BaseChannel):
 
         for pdf in glob.glob(os.path.join(self.folder_path, "*.pdf")):
             try:
-                pages = PyPDFLoader(pdf).load()
+                with metrics.span("parse", source="pdf"):
+                    pages = PyPDFLoader(pdf).load()
                 for i, p in enumerate(pages):
                     md = p.metadata or {}
                     md.setdefault("source", os.path.basename(pdf))
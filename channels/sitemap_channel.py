@@ -1,5 +1,6 @@
 import asyncio
 import concurrent.futures
+import logging
 import random
 import time
 from typing import List, Optional, Set, Tuple
@@ -9,6 +10,8 @@ import aiohttp
 from bs4 import BeautifulSoup
 from langchain_core.documents import Document
 
+from utils import metrics
+
 try:
     import brotlicffi as brotli
 except Exception:
@@ -24,6 +27,8 @@ try:
 except Exception:
     sync_playwright = None
 
+logger = logging.getLogger(__name__)
+
 
 # ----------------------------
 # ROTATING REAL BROWSER USER AGENTS
@@ -116,7 +121,7 @@ def _playwright_fetch(url: str, user_agent: str, timeout_sec: int = 30) -> Optio
             browser.close()
             return html
     except Exception as e:
-        print(f"DEBUG >> Playwright fetch failed for {url}: {e}")
+        logger.warning("Playwright fetch failed for %s: %s", url, e)
         return None
 
 
@@ -134,7 +139,7 @@ def _tls_client_fetch(url: str, headers: dict, fingerprint_id: Optional[str] = N
         text = _safe_decode(resp.content, resp.headers.get("Content-Encoding"))
         return text, resp.status_code
     except Exception as e:
-        print(f"DEBUG >> tls-client fetch error for {url}: {e}")
+        logger.warning("tls-client fetch error for %s: %s", url, e)
         return None
 
 
@@ -171,6 +176,9 @@ class SitemapChannel:
         self._visited_sitemaps: Set[str] = set()
         self._visited_pages: Set[str] = set()
 
+    def name(self):
+        return "sitemap_channel"
+
     # ----------------------------
     # Determine if text looks like sitemap xml
     # ----------------------------
@@ -227,22 +235,30 @@ class SitemapChannel:
                     raw = await resp.read()
                     return _safe_decode(raw, resp.headers.get("Content-Encoding"))
         except Exception as e:
-            # print(f"DEBUG >> aiohttp fetch error {url}: {e}")
+            logger.debug("aiohttp fetch error %s: %s", url, e)
             return None
 
     async def _robust_fetch(self, url: str) -> Optional[str]:
+        with metrics.span("fetch"):
+            text, tier = await self._robust_fetch_tiers(url)
+        metrics.inc("rag_fetch_tier_total", tier=tier)
+        if text and metrics.is_enabled():
+            metrics.inc("rag_fetched_bytes_total", len(text.encode("utf-8", errors="ignore")))
+        return text
+
+    async def _robust_fetch_tiers(self, url: str) -> Tuple[Optional[str], str]:
         # 1. try aiohttp with preferred UA
         async with aiohttp.ClientSession() as session:
             text = await self._fetch_async(session, url, self.preferred_user_agent)
             if text:
-                return text
+                return text, "aiohttp"
 
             # 2. rotate through pool (non-blocking minimal attempts)
             for _ in range(min(len(self.ua_pool), 4)):
                 ua = random.choice(self.ua_pool)
                 text = await self._fetch_async(session, url, ua)
                 if text:
-                    return text
+                    return text, "ua_rotation"
 
         # 3. tls-client fallback (sync) if enabled
         if self.enable_tlsclient_fallback and tls_client is not None:
@@ -253,16 +269,16 @@ class SitemapChannel:
                 if res:
                     text, status = res
                     if text:
-                        return text
+                        return text, "tls_client"
 
         # 4. Playwright fallback (slow but reliable)
         if self.enable_playwright_fallback and sync_playwright is not None:
             for ua in (self.preferred_user_agent, ) + tuple(self.ua_pool):
                 html = _playwright_fetch(url, ua)
                 if html:
-                    return html
+                    return html, "playwright"
 
-        return None
+        return None, "failed"
 
     async def crawl_sitemaps(self) -> List[str]:
         to_visit = [self.sitemap_url]
@@ -276,7 +292,7 @@ class SitemapChannel:
 
             xml = await self._robust_fetch(sitemap)
             if not xml:
-                # print(f"DEBUG >> Could not fetch sitemap: {sitemap}")
+                logger.warning("Could not fetch sitemap: %s", sitemap)
                 continue
 
             if not self._looks_like_sitemap(xml):
@@ -318,13 +334,14 @@ class SitemapChannel:
                 text = await self._robust_fetch(u)
                 if not text:
                     return None
-                if text.strip().startswith("<?xml") or "<urlset" in text.lower() or "<sitemapindex" in text.lower():
-                    soup = BeautifulSoup(text, "lxml-xml")
-                else:
-                    soup = BeautifulSoup(text, "html.parser")
-                for tag in soup(["script", "style", "noscript", "header", "footer", "nav"]):
-                    tag.decompose()
-                page_text = soup.get_text(separator="\n", strip=True)
+                with metrics.span("parse", source="sitemap"):
+                    if text.strip().startswith("<?xml") or "<urlset" in text.lower() or "<sitemapindex" in text.lower():
+                        soup = BeautifulSoup(text, "lxml-xml")
+                    else:
+                        soup = BeautifulSoup(text, "html.parser")
+                    for tag in soup(["script", "style", "noscript", "header", "footer", "nav"]):
+                        tag.decompose()
+                    page_text = soup.get_text(separator="\n", strip=True)
                 if not page_text:
                     return None
                 return Document(page_content=page_text[:20000], metadata={"source": u})
@@ -340,9 +357,11 @@ class SitemapChannel:
         start = time.time()
         pages = asyncio.run(self.crawl_sitemaps())
         if not pages:
-            print("DEBUG >> No pages found in sitemap")
+            logger.warning("No pages found in sitemap %s", self.sitemap_url)
             return []
 
         docs = asyncio.run(self._scrape_pages(pages[: self.max_pages]))
-        print(f"DEBUG >> SitemapChannel: found {len(pages)} pages, scraped {len(docs)} docs in {time.time()-start:.2f}s")
+        logger.info(
+            "SitemapChannel: found %d pages, scraped %d docs in %.2fs", len(pages), len(docs), time.time() - start
+        )
         return docs
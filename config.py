@@ -12,3 +12,18 @@ class Config:
     STREAMLIT_PORT = int(os.getenv('PORT', 8501))
     MAX_SITEMAP_PAGES = int(os.getenv('MAX_SITEMAP_PAGES', 200))
     GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+    # "" = query Chroma directly; float32 / float16 / int8 = in-memory index
+    MEMORY_INDEX_DTYPE = os.getenv('MEMORY_INDEX_DTYPE', '')
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0').lower() in ('1', 'true', 'yes')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
+    # write a collapsed-stack sampling profile of ingestion to this path
+    PROFILE_INGEST_PATH = os.getenv('PROFILE_INGEST_PATH', '')
+    # retrieval knobs; see evaluation/evaluate.py for picking values
+    RETRIEVER_K = int(os.getenv('RETRIEVER_K', 8))
+    RERANK_TOP_K = int(os.getenv('RERANK_TOP_K', 5))
+    CONTEXT_DOCS = int(os.getenv('CONTEXT_DOCS', 3))
+    CONTEXT_CHARS = int(os.getenv('CONTEXT_CHARS', 900))
+    CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', 0))
+    CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', 100))
+    # multi-site mode: "name=sitemap_url_or_folder,..." gives each site its own collection
+    SITES = os.getenv('SITES', '')
@@ -0,0 +1,27 @@
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+
+class UnitFakeEmbedding(DeterministicFakeEmbedding):
+    """
+    Deterministic fake vectors scaled to unit length, like all-MiniLM-L6-v2's.
+    Chroma ranks by L2 and the memory index by cosine; the two orders only
+    agree on normalised vectors.
+    """
+
+    def _get_embedding(self, seed: int):
+        v = np.asarray(super()._get_embedding(seed=seed))
+        return (v / (np.linalg.norm(v) + 1e-12)).tolist()
+
+
+def make_embeddings(kind: str = "hf"):
+    """
+    "hf"   -> the app's all-MiniLM-L6-v2 HuggingFaceEmbeddings
+    "fake" -> UnitFakeEmbedding, for offline runs with no model download
+    """
+    if kind == "fake":
+        return UnitFakeEmbedding(size=384)
+    if kind != "hf":
+        raise ValueError(f"unknown embeddings kind {kind!r}, expected 'hf' or 'fake'")
+    from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
@@ -0,0 +1,193 @@
+"""
+Retrieval quality-vs-latency evaluation.
+
+Runs a labeled question -> expected-source set across a grid of retriever
+k, reranker, chunking, index type and context size, and reports recall,
+MRR and per-query latency side by side. With --min-recall it also picks
+the cheapest configuration that meets the bar.
+
+    python -m evaluation.evaluate --k 4,8,16 --rerank none,3,5 --chunk 0,500 \\
+        --index chroma,int8 --context-docs 2,3 --min-recall 0.9
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from channels.base import BaseChannel
+from channels.folder_channel import FolderChannel
+from channels.sitemap_channel import SitemapChannel
+from config import Config
+from embeddings.factory import make_embeddings
+from ingestion.ingestion_manager import IngestionManager
+from ui.streamlit_app import rerank_by_embedding
+from vector.chroma_manager import ChromaManager
+
+
+DEFAULT_EVAL_SET = os.path.join(os.path.dirname(__file__), "insurance_docs_eval.json")
+
+
+class _StaticChannel(BaseChannel):
+    """Replays documents loaded once so every configuration ingests the same corpus."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def name(self):
+        return "static_channel"
+
+    def load_documents(self):
+        return [Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in self.docs]
+
+
+def _source_key(doc) -> str:
+    return os.path.basename(str(doc.metadata.get("source", "")))
+
+
+def _recall(docs, expected) -> float:
+    found = {_source_key(d) for d in docs}
+    return len(found & expected) / len(expected)
+
+
+def _reciprocal_rank(docs, expected) -> float:
+    for rank, d in enumerate(docs, start=1):
+        if _source_key(d) in expected:
+            return 1.0 / rank
+    return 0.0
+
+
+def _csv(value, cast=str):
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def _rerank_option(value):
+    return None if value.lower() == "none" else int(value)
+
+
+def evaluate_config(chroma, emb, eval_set, k, rerank_top_k, context_docs, max_chars):
+    """Run every question once per (k, reranker); context sizes reuse that ranking."""
+    retriever = chroma.as_retriever(k=k)
+    retriever.invoke(eval_set[0]["question"])  # warm-up
+
+    latencies, recalls_k, mrrs = [], [], []
+    ctx_recalls = {n: [] for n in context_docs}
+    ctx_chars = {n: [] for n in context_docs}
+
+    for item in eval_set:
+        expected = set(item["expected_sources"])
+        t0 = time.perf_counter()
+        docs = retriever.invoke(item["question"])
+        ranked = rerank_by_embedding(item["question"], docs, emb, top_k=rerank_top_k)[0] if rerank_top_k else docs
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        recalls_k.append(_recall(docs, expected))
+        mrrs.append(_reciprocal_rank(ranked, expected))
+        for n in context_docs:
+            ctx_recalls[n].append(_recall(ranked[:n], expected))
+            ctx_chars[n].append(sum(min(len(d.page_content), max_chars) for d in ranked[:n]))
+
+    base = {
+        "k": k,
+        "rerank": rerank_top_k or "none",
+        "recall_at_k": float(np.mean(recalls_k)),
+        "mrr": float(np.mean(mrrs)),
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+    }
+    return [
+        dict(
+            base,
+            context_docs=n,
+            recall_in_context=float(np.mean(ctx_recalls[n])),
+            context_chars=float(np.mean(ctx_chars[n])),
+        )
+        for n in context_docs
+    ]
+
+
+def run(args):
+    with open(args.eval_set, encoding="utf-8") as f:
+        eval_set = json.load(f)
+
+    emb = make_embeddings(args.embeddings)
+
+    corpus = FolderChannel(args.folder).load_documents()
+    if args.sitemap:
+        corpus += SitemapChannel(args.sitemap, max_pages=args.max_pages).load_documents()
+
+    rows = []
+    for chunk_size, index in itertools.product(args.chunk, args.index):
+        with tempfile.TemporaryDirectory(prefix="rag-eval-") as tmp:
+            chroma = ChromaManager(tmp, emb, memory_index_dtype=None if index == "chroma" else index)
+            IngestionManager(
+                [_StaticChannel(corpus)], chroma, chunk_size=chunk_size, chunk_overlap=args.chunk_overlap
+            ).ingest_all()
+            records = chroma.store._collection.count()
+
+            for k, rerank_top_k in itertools.product(args.k, args.rerank):
+                for row in evaluate_config(chroma, emb, eval_set, k, rerank_top_k, args.context_docs, args.max_chars):
+                    rows.append(dict(row, chunk=chunk_size, index=index, records=records))
+
+    result = {"questions": len(eval_set), "rows": rows}
+    if args.min_recall is not None:
+        ok = [r for r in rows if r["recall_in_context"] >= args.min_recall]
+        ok.sort(key=lambda r: (r["latency_p50_ms"], r["context_chars"]))
+        result["recommended"] = ok[0] if ok else None
+    return result
+
+
+COLUMNS = (
+    ("index", "{:>8}"), ("chunk", "{:>6}"), ("k", "{:>3}"), ("rerank", "{:>6}"), ("context_docs", "{:>4}"),
+    ("recall_at_k", "{:>8.3f}"), ("recall_in_context", "{:>8.3f}"), ("mrr", "{:>6.3f}"),
+    ("latency_p50_ms", "{:>8.2f}"), ("latency_p95_ms", "{:>8.2f}"), ("context_chars", "{:>8.0f}"),
+)
+HEADERS = ("index", "chunk", "k", "rerank", "ctx", "R@k", "R@ctx", "MRR", "p50 ms", "p95 ms", "chars")
+
+
+def format_table(rows) -> str:
+    widths = [len(fmt.format(rows[0][key])) if rows else len(h) for (key, fmt), h in zip(COLUMNS, HEADERS)]
+    lines = ["  ".join(h.rjust(w) for h, w in zip(HEADERS, widths))]
+    for r in rows:
+        lines.append("  ".join(fmt.format(r[key]) for key, fmt in COLUMNS))
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--eval-set", default=DEFAULT_EVAL_SET)
+    p.add_argument("--folder", default=Config.DATA_FOLDER)
+    p.add_argument("--sitemap", help="also ingest this sitemap (needs network)")
+    p.add_argument("--max-pages", type=int, default=Config.MAX_SITEMAP_PAGES)
+    p.add_argument("--k", type=lambda v: _csv(v, int), default=[Config.RETRIEVER_K])
+    p.add_argument("--rerank", type=lambda v: _csv(v, _rerank_option), default=[Config.RERANK_TOP_K],
+                   help="comma list of rerank top_k values, 'none' to skip reranking")
+    p.add_argument("--chunk", type=lambda v: _csv(v, int), default=[Config.CHUNK_SIZE],
+                   help="comma list of chunk sizes, 0 = whole documents")
+    p.add_argument("--chunk-overlap", type=int, default=Config.CHUNK_OVERLAP)
+    p.add_argument("--index", type=_csv, default=["chroma"], help="chroma, float32, float16 and/or int8")
+    p.add_argument("--context-docs", type=lambda v: _csv(v, int), default=[Config.CONTEXT_DOCS])
+    p.add_argument("--max-chars", type=int, default=Config.CONTEXT_CHARS)
+    p.add_argument("--embeddings", choices=("hf", "fake"), default="hf")
+    p.add_argument("--min-recall", type=float, help="recommend the cheapest config with recall_in_context >= this")
+    p.add_argument("--out", help="also write the full results as JSON")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run(args)
+    print(format_table(result["rows"]))
+    if "recommended" in result:
+        print("\nRecommended:", json.dumps(result["recommended"]))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,49 @@
+import logging
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
 class IngestionManager:
-    def __init__(self, channels, chroma):
+    def __init__(self, channels, chroma, chunk_size: int = 0, chunk_overlap: int = 100, retriever_k: int = 8):
+        """
+        chunk_size: split documents into ~chunk_size character chunks before
+                    embedding; 0 stores each loaded document as one record
+        chunk_overlap: characters shared by neighbouring chunks; clamped to
+                       half of chunk_size when it would not fit
+        """
+        if chunk_size and chunk_overlap >= chunk_size:
+            clamped = chunk_size // 2
+            logger.warning(
+                "chunk_overlap %d >= chunk_size %d, using overlap %d", chunk_overlap, chunk_size, clamped
+            )
+            chunk_overlap = clamped
         self.channels = channels
         self.chroma = chroma
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.retriever_k = retriever_k
 
     def ingest_all(self):
         all_docs = []
 
         for ch in self.channels:
-            docs = ch.load_documents()
+            with metrics.span("load", channel=ch.name()):
+                docs = ch.load_documents()
             if docs:
+                metrics.inc("rag_ingested_documents_total", len(docs), channel=ch.name())
                 all_docs.extend(docs)
 
-        self.chroma.add_documents(all_docs)
-        return self.chroma.as_retriever()
+        if self.chunk_size and all_docs:
+            with metrics.span("chunk"):
+                splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+                )
+                all_docs = splitter.split_documents(all_docs)
+
+        with metrics.span("upsert"):
+            self.chroma.add_documents(all_docs)
+        return self.chroma.as_retriever(k=self.retriever_k)
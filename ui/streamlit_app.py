@@ -1,3 +1,4 @@
+import logging
 import streamlit as st
 import textwrap
 import json
@@ -8,26 +9,113 @@ from config import Config
 from llm.groq_llm import GroqLLMWrapper
 from agent.classifier import SimpleKNNClassifier
 from vector.chroma_manager import ChromaManager
+from vector.shard_manager import ShardManager, parse_sites
 from ingestion.ingestion_manager import IngestionManager
 from channels.sitemap_channel import SitemapChannel
 from channels.folder_channel import FolderChannel
+from utils import metrics
 
 from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_core.documents import Document
 
 
+logger = logging.getLogger(__name__)
 cfg = Config()
 r = redis.from_url(cfg.REDIS_URL)
 LAZY_QUEUE = "lazy_index_queue"
 
+# Classifier seeds
+CLASSIFIER_SEEDS = {
+    "insurance": [
+        "insurance policy benefits",
+        "coverage terms",
+        "health coverage",
+        "insurance premium details",
+        "claim process information",
+        "employee health plans",
+        "medical coverage explanation",
+    ],
+
+    "onsurity": [
+        "Onsurity plans",
+        "Onsurity membership",
+        "Onsurity insurance details",
+        "What does Onsurity offer",
+        "Onsurity benefits",
+        "Onsurity health program",
+        "TeamSure plans",
+    ],
+
+    "bot_meta": [
+        "Who created you",
+        "Who built you",
+        "Who is your developer",
+        "Who is Azhar",
+        "Tell me about your creator",
+        "Who made this bot",
+        "bot created by Azhar",
+        "origin of this chatbot",
+        "describe your creator",
+    ],
+
+    "general": [
+        "hi",
+        "hello",
+        "what is this",
+        "how does it work",
+        "explain yourself",
+        "what can you do",
+        "help me understand",
+        "general questions",
+    ],
+}
+
+
+def _run_ingestion(ingest, all_threads=False):
+    """Run `ingest()`, under the sampling profiler when PROFILE_INGEST_PATH is set."""
+    if not cfg.PROFILE_INGEST_PATH:
+        return ingest()
+    with metrics.SamplingProfiler(all_threads=all_threads) as prof:
+        result = ingest()
+    prof.dump(cfg.PROFILE_INGEST_PATH)
+    return result
+
 
 @st.cache_resource
 def init_pipeline(max_pages=200):
     # Embeddings
     emb = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    if metrics.is_enabled():
+        emb = metrics.InstrumentedEmbeddings(emb)
+
+    classifier = SimpleKNNClassifier(CLASSIFIER_SEEDS, emb)
+    llm = GroqLLMWrapper(model_name="llama-3.3-70b-versatile", temperature=0.0)
+
+    # Multi-site mode: one collection (shard) per SITES entry, ingested in parallel
+    sites = parse_sites(cfg.SITES)
+    if sites:
+        shards = ShardManager(
+            "chroma_db",
+            emb,
+            sites,
+            max_pages=max_pages,
+            memory_index_dtype=cfg.MEMORY_INDEX_DTYPE or None,
+            chunk_size=cfg.CHUNK_SIZE,
+            chunk_overlap=cfg.CHUNK_OVERLAP,
+        )
+        # shards ingest in worker threads, so sample every thread
+        _run_ingestion(shards.ingest_all, all_threads=True)
+        return {
+            "emb": emb,
+            "retriever": shards.as_retriever(k=cfg.RETRIEVER_K),
+            "classifier": classifier,
+            "llm": llm,
+            "chroma": shards,
+            "shards": shards,
+        }
 
     # Vector DB
-    chroma = ChromaManager("chroma_db", emb)
+    chroma = ChromaManager("chroma_db", emb, memory_index_dtype=cfg.MEMORY_INDEX_DTYPE or None)
 
     # Channels
     channels = [
@@ -35,59 +123,14 @@ def init_pipeline(max_pages=200):
         FolderChannel(cfg.DATA_FOLDER),
     ]
 
-    ingestion = IngestionManager(channels, chroma)
-    retriever = ingestion.ingest_all()  # returns VectorStoreRetriever with `.invoke()`
-
-    # Classifier seeds
-    seeds = {
-        "insurance": [
-            "insurance policy benefits",
-            "coverage terms",
-            "health coverage",
-            "insurance premium details",
-            "claim process information",
-            "employee health plans",
-            "medical coverage explanation",
-        ],
-
-        "onsurity": [
-            "Onsurity plans",
-            "Onsurity membership",
-            "Onsurity insurance details",
-            "What does Onsurity offer",
-            "Onsurity benefits",
-            "Onsurity health program",
-            "TeamSure plans",
-        ],
-
-        "bot_meta": [
-            "Who created you",
-            "Who built you",
-            "Who is your developer",
-            "Who is Azhar",
-            "Tell me about your creator",
-            "Who made this bot",
-            "bot created by Azhar",
-            "origin of this chatbot",
-            "describe your creator",
-        ],
-
-        "general": [
-            "hi",
-            "hello",
-            "what is this",
-            "how does it work",
-            "explain yourself",
-            "what can you do",
-            "help me understand",
-            "general questions",
-        ],
-    }
-
-    classifier = SimpleKNNClassifier(seeds, emb)
-
-    # LLM
-    llm = GroqLLMWrapper(model_name="llama-3.3-70b-versatile", temperature=0.0)
+    ingestion = IngestionManager(
+        channels,
+        chroma,
+        chunk_size=cfg.CHUNK_SIZE,
+        chunk_overlap=cfg.CHUNK_OVERLAP,
+        retriever_k=cfg.RETRIEVER_K,
+    )
+    retriever = _run_ingestion(ingestion.ingest_all)  # returns VectorStoreRetriever with `.invoke()`
 
     return {
         "emb": emb,
@@ -99,7 +142,8 @@ def init_pipeline(max_pages=200):
 
 
 # ---- KB Priority Search (Local Bot Docs First) ----
-def search_kb_first(query, emb, chroma, kb_keywords=None):
+def search_kb_first(query, emb, chroma, kb_keywords=None, shards=None):
+    """shards: in multi-site mode, the selected shard names to search (chroma is a ShardManager)"""
     if kb_keywords is None:
         kb_keywords = ("azhar", "creator", "developer", "who built", "who made", "author", "bot")
 
@@ -110,11 +154,11 @@ def search_kb_first(query, emb, chroma, kb_keywords=None):
         return None, False
 
     try:
-        kb_docs = chroma.search_local_only()
+        kb_docs = chroma.search_local_only() if shards is None else chroma.search_local_only(shards=shards)
         if kb_docs:
             return kb_docs, True
     except Exception as e:
-        print("DEBUG >> KB search error:", e)
+        logger.warning("KB search error: %s", e)
 
     return None, False
 
@@ -133,14 +177,12 @@ def rerank_by_embedding(query: str, docs, emb, top_k=5):
     return [d for d, _ in ranked[:top_k]], ranked[:top_k]
 
 
-def generate_answer(llm, query, docs):
-    max_chars = 900
-
+def generate_answer(llm, query, docs, max_docs=3, max_chars=900):
     context = "\n\n".join(
         [
             f"Source: {d.metadata.get('source','-')}\n"
             f"{textwrap.shorten(d.page_content, width=max_chars, placeholder='...')}"
-            for d in docs[:3]
+            for d in docs[:max_docs]
         ]
     )
 
@@ -151,12 +193,18 @@ def generate_answer(llm, query, docs):
 
     user_msg = f"Question: {query}\n\nContext:\n{context}"
 
-    return llm.chat(system_msg, user_msg), list(
-        {d.metadata.get("source", "-") for d in docs[:3]}
+    with metrics.span("llm"):
+        answer = llm.chat(system_msg, user_msg)
+
+    return answer, list(
+        {d.metadata.get("source", "-") for d in docs[:max_docs]}
     )
 
 
 def run_streamlit():
+    if metrics.is_enabled():
+        metrics.start_metrics_server(cfg.METRICS_PORT)
+
     st.title("🛡️ Agentic RAG — OnSurity Chatbot")
 
     with st.sidebar:
@@ -168,6 +216,17 @@ def run_streamlit():
     pipeline = init_pipeline(max_pages=max_pages)
 
     retriever = pipeline["retriever"]
+    shards = pipeline.get("shards")
+    selected = None
+    if shards is not None:
+        with st.sidebar:
+            selected = st.multiselect("Sites", shards.names, default=shards.names)
+            with st.expander("Shard stats"):
+                st.json(shards.stats())
+        if not selected:
+            st.warning("Select at least one site to search.")
+            return
+        retriever = shards.as_retriever(k=cfg.RETRIEVER_K, shards=selected)
     classifier = pipeline["classifier"]
     emb = pipeline["emb"]
     llm = pipeline["llm"]
@@ -177,17 +236,21 @@ def run_streamlit():
         return
 
     # Router
-    labels = classifier.predict_topk(query, k=1)
+    with metrics.span("classify"):
+        labels = classifier.predict_topk(query, k=1)
     topic, score = labels[0]
-    print("DEBUG Topic:", labels)
+    logger.debug("Topic: %s", labels)
 
     # Retrieve
-    docs = retriever.invoke(query)
-    kb_docs, forced = search_kb_first(query, pipeline["emb"], pipeline["chroma"])
+    with metrics.span("retrieve"):
+        docs = retriever.invoke(query)
+        kb_docs, forced = search_kb_first(query, pipeline["emb"], pipeline["chroma"], shards=selected)
 
     if forced and kb_docs:
-        top_docs = kb_docs[:3]
-        answer, sources = generate_answer(pipeline["llm"], query, top_docs)
+        top_docs = kb_docs[:cfg.CONTEXT_DOCS]
+        answer, sources = generate_answer(
+            pipeline["llm"], query, top_docs, max_docs=cfg.CONTEXT_DOCS, max_chars=cfg.CONTEXT_CHARS
+        )
 
         st.subheader("Answer")
         st.write(answer)
@@ -198,10 +261,13 @@ def run_streamlit():
         return
 
     # Rerank
-    top_docs, _ = rerank_by_embedding(query, docs, emb)
+    with metrics.span("rerank"):
+        top_docs, _ = rerank_by_embedding(query, docs, emb, top_k=cfg.RERANK_TOP_K)
 
     # LLM answer
-    answer, sources = generate_answer(llm, query, top_docs)
+    answer, sources = generate_answer(
+        llm, query, top_docs, max_docs=cfg.CONTEXT_DOCS, max_chars=cfg.CONTEXT_CHARS
+    )
 
     st.subheader("Answer")
     st.write(answer)
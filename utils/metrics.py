@@ -0,0 +1,293 @@
+import bisect
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# seconds; covers sub-ms classifier calls up to slow sitemap crawls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_enabled = Config.METRICS_ENABLED
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, tuple], float] = collections.defaultdict(float)
+_histograms: Dict[Tuple[str, tuple], "Histogram"] = {}
+_server = None
+_server_lock = threading.Lock()
+
+
+def enable(flag: bool = True):
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def observe(name: str, value: float, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(value)
+
+
+class _Span:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        observe("rag_stage_duration_seconds", elapsed, stage=self.stage, **self.labels)
+        if exc_type is not None:
+            inc("rag_stage_errors_total", stage=self.stage)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage: str, **labels):
+    """
+    Time a block into the `rag_stage_duration_seconds{stage=...}` histogram.
+
+    with metrics.span("retrieve"):
+        docs = retriever.invoke(query)
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(stage, labels)
+
+
+def snapshot() -> dict:
+    """Plain-dict view of the current metrics, e.g. for JSON benchmark output."""
+    with _lock:
+        counters = {_flat(k): v for k, v in _counters.items()}
+        hists = {_flat(k): {"count": h.count, "sum": h.sum} for k, h in _histograms.items()}
+    return {"counters": counters, "histograms": hists}
+
+
+def _flat(key) -> str:
+    name, labels = key
+    return name + _fmt_labels(labels)
+
+
+# ----------------------------
+# Prometheus text exposition
+# ----------------------------
+def _fmt_labels(labels: tuple, extra: Optional[tuple] = None) -> str:
+    items = list(labels) + list(extra or ())
+    if not items:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        hists = sorted((k, (h.buckets, list(h.counts), h.sum, h.count)) for k, h in _histograms.items())
+
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+
+    for (name, labels), (buckets, counts, total, count) in hists:
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        cumulative = 0
+        for bound, c in zip(buckets, counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+        lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """
+    Serve /metrics from a daemon thread. Safe to call on every Streamlit rerun
+    and from concurrent sessions; returns None if the port cannot be bound.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("metrics server could not bind %s:%s: %s", host, port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
+
+
+# ----------------------------
+# Embedding wrapper
+# ----------------------------
+class InstrumentedEmbeddings(Embeddings):
+    """Wraps an Embeddings object so every call lands in the `embed` stage."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+
+    def embed_documents(self, texts):
+        with span("embed", kind="documents"):
+            return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        with span("embed", kind="query"):
+            return self.inner.embed_query(text)
+
+
+# ----------------------------
+# Sampling profiler
+# ----------------------------
+class SamplingProfiler:
+    """
+    Minimal wall-clock sampler: a daemon thread snapshots one thread's stack
+    (or, with all_threads=True, every other thread's, each stack rooted at
+    the thread name) every `interval` seconds. Output is in collapsed-stack
+    format ("a;b;c count"), which flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None, all_threads: bool = False):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.all_threads = all_threads
+        self.samples: Dict[str, int] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _record(self, frame, root: Optional[str] = None):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        if root is not None:
+            stack.append(root)
+        if stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if not self.all_threads:
+                self._record(frames.get(self.thread_id))
+                continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident != own:
+                    self._record(frame, root=names.get(ident, str(ident)))
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in sorted(self.samples.items()))
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed() + "\n")
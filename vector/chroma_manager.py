@@ -1,37 +1,108 @@
+import logging
+import os
+from typing import Optional
+
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from .memory_index import MemoryIndexRetriever, MemoryVectorIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "insurance_docs"
+LOCAL_KB_QUERY = "bot info"
+LOCAL_KB_WHERE = {"source": {"$contains": "insurance_docs"}}
 
 
 class ChromaManager:
-    def __init__(self, persist_dir, embedding_model):
+    def __init__(
+        self,
+        persist_dir,
+        embedding_model,
+        memory_index_dtype: Optional[str] = None,
+        collection_name: str = DEFAULT_COLLECTION,
+    ):
+        """
+        memory_index_dtype: "float32" / "float16" / "int8" to serve queries from an
+        in-process MemoryVectorIndex kept in sync with the collection; None = Chroma only
+        collection_name: one collection per site shard (see ShardManager)
+        """
         self.embedding_model = embedding_model
+        self.collection_name = collection_name
 
         self.store = Chroma(
-            collection_name="insurance_docs",
+            collection_name=collection_name,
             persist_directory=persist_dir,
             embedding_function=embedding_model,
         )
 
+        self.memory_index = None
+        if memory_index_dtype:
+            index_dir = "memory_index" if collection_name == DEFAULT_COLLECTION else f"memory_index_{collection_name}"
+            self.memory_index = MemoryVectorIndex(
+                os.path.join(persist_dir, index_dir), embedding_model, dtype=memory_index_dtype
+            )
+            self.memory_index.load_or_build(self.store)
+
+    def count(self) -> int:
+        return self.store._collection.count()
+
     def add_documents(self, docs):
         if not docs:
             return
         texts = [d.page_content for d in docs]
         metas = [d.metadata for d in docs]
-        self.store.add_texts(texts=texts, metadatas=metas)
+        ids = self.store.add_texts(texts=texts, metadatas=metas)
+
+        if self.memory_index is not None:
+            # read back the vectors Chroma just stored instead of re-embedding
+            res = self.store.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+            self.memory_index.add(res["ids"], res["documents"], res["metadatas"], res["embeddings"])
+
+    def search_by_vector(self, q_emb, k: int = 8, where: Optional[dict] = None):
+        """
+        Return [(doc, relevance)] with higher = more similar, comparable across collections.
+        `where` is only honoured by the memory index; see search_local_by_vector.
+        """
+        if self.memory_index is not None:
+            idx = self.memory_index
+            return [
+                (Document(page_content=idx.texts[row], metadata=dict(idx.metadatas[row])), score)
+                for row, score in idx.search_vector(q_emb, k=k, where=where)
+            ]
+        to_relevance = self.store._select_relevance_score_fn()
+        return [
+            (doc, to_relevance(dist))
+            for doc, dist in self.store.similarity_search_by_vector_with_relevance_scores(q_emb, k=k)
+        ]
+
+    def search_local_by_vector(self, q_emb, k: int = 10):
+        """Scored variant of search_local_only for callers that merge several collections."""
+        if self.memory_index is not None:
+            return self.search_by_vector(q_emb, k=k, where=LOCAL_KB_WHERE)
+        return [
+            (d, score) for d, score in self.search_by_vector(q_emb, k=k)
+            if "insurance_docs" in d.metadata.get("source", "")
+        ]
 
     def search_local_only(self):
         """Return KB-only docs from data/insurance_docs folder."""
         try:
-            results = self.store.similarity_search("bot info", k=10)
+            if self.memory_index is not None:
+                return self.memory_index.search(LOCAL_KB_QUERY, k=10, where=LOCAL_KB_WHERE)
+            results = self.store.similarity_search(LOCAL_KB_QUERY, k=10)
             filtered = [
                 d for d in results
                 if "insurance_docs" in d.metadata.get("source", "")
             ]
             return filtered
         except Exception as e:
-            print("DEBUG >> search_local_only error:", e)
+            logger.warning("search_local_only error: %s", e)
             return []
 
-    def as_retriever(self):
+    def as_retriever(self, k: int = 8):
+        if self.memory_index is not None:
+            return MemoryIndexRetriever(index=self.memory_index, k=k)
         return self.store.as_retriever(
-            search_kwargs={"k": 8}
+            search_kwargs={"k": k}
         )  # retriever supports `.invoke()`
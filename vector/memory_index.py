@@ -0,0 +1,354 @@
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from utils import metrics
+
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+# rows scored per block when the stored matrix has to be upcast to float32
+_BLOCK_ROWS = 8192
+
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    mat = np.ascontiguousarray(mat, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    return mat / (norms + 1e-12)
+
+
+def _quantize(mat: np.ndarray, dtype: str):
+    """Return (stored_matrix, per_row_scales) for the requested dtype."""
+    if dtype == "float32":
+        return mat, None
+    if dtype == "float16":
+        return mat.astype(np.float16), None
+    # symmetric per-row int8: v ~= q * scale
+    scales = np.abs(mat).max(axis=1) / 127.0 if len(mat) else np.zeros(0, np.float32)
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    q = np.clip(np.rint(mat / scales[:, None]), -127, 127).astype(np.int8)
+    return q, scales
+
+
+def _matches(meta: dict, where: dict) -> bool:
+    """Tiny subset of Chroma's `where` syntax: equality, $in and $contains."""
+    for key, cond in where.items():
+        val = meta.get(key)
+        if isinstance(cond, dict):
+            if "$in" in cond and val not in cond["$in"]:
+                return False
+            if "$contains" in cond and (val is None or cond["$contains"] not in str(val)):
+                return False
+        elif val != cond:
+            return False
+    return True
+
+
+class MemoryVectorIndex:
+    """
+    In-process copy of the Chroma collection for low-latency search.
+
+    Vectors are L2-normalised and stored as float32, float16 or per-row int8.
+    The full-precision matrix is always written to disk and memory-mapped so
+    that the top candidates from the quantized scan can be re-scored exactly
+    without holding both in RAM.
+
+    On disk the index is a list of append-only segments (one per ingest
+    batch) named by manifest.json; adding rows writes only a new segment.
+    Once there are more than `max_segments`, they are compacted into one.
+    """
+
+    def __init__(self, index_dir: str, embedding_model, dtype: str = "int8", rescore_factor: int = 4,
+                 max_segments: int = 16):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}, got {dtype!r}")
+        self.index_dir = index_dir
+        self.embedding_model = embedding_model
+        self.dtype = dtype
+        self.rescore_factor = max(1, int(rescore_factor))
+        self.max_segments = max(1, int(max_segments))
+
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        # per segment: (name, float32 memmap, quantized memmap or the same f32 map, int8 scales)
+        self._segments: List[tuple] = []
+        self._offsets = np.zeros(0, dtype=np.int64)
+        self._next_segment = 0
+        # segments named by an on-disk manifest that load() did not open
+        # (other dtype, damaged); removed once a rebuild replaces them
+        self._unloaded: List[str] = []
+        self._mask_cache: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def _path(self, *names: str) -> str:
+        return os.path.join(self.index_dir, *names)
+
+    def _write_segment(self, full: np.ndarray, ids, texts, metadatas) -> str:
+        name = f"seg_{self._next_segment:05d}"
+        self._next_segment += 1
+        os.makedirs(self._path(name), exist_ok=True)
+
+        stored, scales = _quantize(full, self.dtype)
+        np.save(self._path(name, "vectors_f32.npy"), full)
+        if self.dtype != "float32":
+            np.save(self._path(name, f"vectors_{self.dtype}.npy"), stored)
+        if scales is not None:
+            np.save(self._path(name, "scales.npy"), scales)
+        with open(self._path(name, "records.jsonl"), "w", encoding="utf-8") as f:
+            for rec in zip(ids, texts, metadatas):
+                f.write(json.dumps(rec) + "\n")
+        return name
+
+    def _write_manifest(self, names: List[str]):
+        # the manifest is the commit point: segments not listed in it are ignored
+        tmp = self._path("manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "segments": names, "next_segment": self._next_segment}, f)
+        os.replace(tmp, self._path("manifest.json"))
+
+    def _open_segment(self, name: str):
+        full = np.load(self._path(name, "vectors_f32.npy"), mmap_mode="r")
+        if self.dtype == "float32":
+            return name, full, full, None
+        stored = np.load(self._path(name, f"vectors_{self.dtype}.npy"), mmap_mode="r")
+        scales = np.load(self._path(name, "scales.npy")) if self.dtype == "int8" else None
+        return name, full, stored, scales
+
+    def _set_segments(self, segments):
+        self._segments = segments
+        sizes = [len(seg[1]) for seg in segments]
+        self._offsets = np.cumsum([0] + sizes[:-1]).astype(np.int64) if sizes else np.zeros(0, np.int64)
+        self._mask_cache.clear()
+
+    def _replace_all(self, full: np.ndarray):
+        """Write everything as a single segment and drop the old ones."""
+        old = [seg[0] for seg in self._segments] + self._unloaded
+        name = self._write_segment(full, self.ids, self.texts, self.metadatas)
+        self._write_manifest([name])
+        self._set_segments([self._open_segment(name)])
+        self._unloaded = []
+        for stale in old:
+            if stale != name:
+                shutil.rmtree(self._path(stale), ignore_errors=True)
+
+    def load(self) -> bool:
+        """Open a previously saved index. Returns False if missing or built with another dtype."""
+        try:
+            with open(self._path("manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+            # keep numbering past the segments on disk even when they cannot be
+            # used, so a rebuild never writes into a directory the old manifest names
+            self._next_segment = manifest.get("next_segment", len(manifest["segments"]))
+            self._unloaded = list(manifest["segments"])
+            if manifest.get("dtype") != self.dtype:
+                return False
+            ids, texts, metas, segments = [], [], [], []
+            for name in manifest["segments"]:
+                with open(self._path(name, "records.jsonl"), encoding="utf-8") as f:
+                    for line in f:
+                        rid, text, meta = json.loads(line)
+                        ids.append(rid)
+                        texts.append(text)
+                        metas.append(meta)
+                segments.append(self._open_segment(name))
+            self.ids, self.texts, self.metadatas = ids, texts, metas
+            self._set_segments(segments)
+            self._unloaded = []
+            return sum(len(seg[1]) for seg in segments) == len(self.ids)
+        except (OSError, ValueError, KeyError):
+            return False
+
+    # ----------------------------
+    # Build / sync with Chroma
+    # ----------------------------
+    def build_from_chroma(self, store, page_size: int = 5000):
+        """Rebuild the index from every record of a langchain `Chroma` store."""
+        ids, texts, metas, vecs = [], [], [], []
+        offset = 0
+        while True:
+            res = store.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            batch = res.get("ids") or []
+            if not batch:
+                break
+            ids.extend(batch)
+            texts.extend(res["documents"])
+            metas.extend(m or {} for m in res["metadatas"])
+            vecs.append(np.asarray(res["embeddings"], dtype=np.float32))
+            offset += len(batch)
+            if len(batch) < page_size:
+                break
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.ids, self.texts, self.metadatas = ids, texts, metas
+        full = _normalize(np.vstack(vecs)) if vecs else np.zeros((0, 0), np.float32)
+        self._replace_all(full)
+
+    def load_or_build(self, store):
+        count = store._collection.count()
+        if not self.load() or len(self) != count:
+            self.build_from_chroma(store)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict], embeddings):
+        """Append freshly ingested records (already written to Chroma) as a new segment."""
+        if not ids:
+            return
+        new = _normalize(np.asarray(embeddings, dtype=np.float32))
+        metadatas = [m or {} for m in metadatas]
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+
+        segments = [seg for seg in self._segments if len(seg[1])]
+        if len(segments) >= self.max_segments:
+            # compaction: the one O(corpus) rewrite, amortised over max_segments adds
+            full = np.vstack([np.asarray(seg[1]) for seg in segments] + [new])
+            self._replace_all(full)
+            return
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        name = self._write_segment(new, ids, texts, metadatas)
+        empty = [seg[0] for seg in self._segments if not len(seg[1])]
+        segments.append(self._open_segment(name))
+        self._write_manifest([seg[0] for seg in segments])
+        self._set_segments(segments)
+        for stale in empty:
+            shutil.rmtree(self._path(stale), ignore_errors=True)
+
+    # ----------------------------
+    # Search
+    # ----------------------------
+    def _filter_mask(self, where: dict) -> np.ndarray:
+        key = json.dumps(where, sort_keys=True, default=str)
+        mask = self._mask_cache.get(key)
+        metrics.inc("rag_cache_requests_total", cache="filter_mask", result="miss" if mask is None else "hit")
+        if mask is None:
+            mask = np.fromiter((_matches(m, where) for m in self.metadatas), dtype=bool, count=len(self.metadatas))
+            self._mask_cache[key] = mask
+        return mask
+
+    def _scan(self, q: np.ndarray) -> np.ndarray:
+        parts = []
+        for _, _, stored, scales in self._segments:
+            if not len(stored):
+                parts.append(np.zeros(0, dtype=np.float32))
+            elif stored.dtype == np.float32:
+                parts.append(stored @ q)
+            else:
+                parts.append(self._scan_quantized(stored, scales, q))
+        return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+    @staticmethod
+    def _scan_quantized(stored, scales, q):
+        scores = np.empty(len(stored), dtype=np.float32)
+        for start in range(0, len(stored), _BLOCK_ROWS):
+            block = stored[start:start + _BLOCK_ROWS].astype(np.float32)
+            scores[start:start + _BLOCK_ROWS] = block @ q
+        if scales is not None:
+            scores *= scales
+        return scores
+
+    def _full_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Gather float32 rows (sorted global row numbers) from the segment memory maps."""
+        seg_of = np.searchsorted(self._offsets, rows, side="right") - 1
+        out = np.empty((len(rows), self._segments[seg_of[0]][1].shape[1]), dtype=np.float32)
+        for seg in np.unique(seg_of):
+            sel = seg_of == seg
+            out[sel] = self._segments[seg][1][rows[sel] - self._offsets[seg]]
+        return out
+
+    def search_vector(self, q_emb, k: int = 8, where: Optional[dict] = None):
+        """Return [(row, cosine_score)] for the top-k rows, best first."""
+        n = len(self.ids)
+        if n == 0 or k <= 0:
+            return []
+        q = _normalize(np.asarray(q_emb, dtype=np.float32))
+
+        scores = self._scan(q)
+        if where:
+            mask = self._filter_mask(where)
+            if not mask.any():
+                return []
+            scores = np.where(mask, scores, -np.inf)
+            n = int(mask.sum())
+
+        k = min(k, n)
+        n_cand = min(k * self.rescore_factor if self.dtype != "float32" else k, n)
+        cand = np.argpartition(-scores, n_cand - 1)[:n_cand]
+
+        if self.dtype != "float32":
+            # exact re-scoring from the full-precision memory map
+            cand = np.sort(cand)
+            scores_c = self._full_rows(cand) @ q
+        else:
+            scores_c = scores[cand]
+
+        order = np.argsort(-scores_c)[:k]
+        return [(int(cand[i]), float(scores_c[i])) for i in order]
+
+    def search(self, query: str, k: int = 8, where: Optional[dict] = None) -> List[Document]:
+        q_emb = self.embedding_model.embed_query(query)
+        return [
+            Document(page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+            for row, _ in self.search_vector(q_emb, k=k, where=where)
+        ]
+
+
+class MemoryIndexRetriever(BaseRetriever):
+    """LangChain retriever over a MemoryVectorIndex (supports `.invoke()`)."""
+
+    index: Any
+    k: int = 8
+    where: Optional[dict] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.index.search(query, k=self.k, where=self.where)
+
+
+def benchmark_vs_chroma(store, index: MemoryVectorIndex, queries: List[str], k: int = 8) -> dict:
+    """
+    Compare the memory index against Chroma's own similarity search.
+
+    Recall@k treats the Chroma result ids as ground truth. The index ranks by
+    cosine while a default Chroma collection ranks by L2, so the comparison
+    is only meaningful for normalised embeddings (as all-MiniLM-L6-v2 emits).
+    Latencies cover the vector search only; query embeddings are computed
+    once up front.
+    """
+    q_embs = [index.embedding_model.embed_query(q) for q in queries]
+    chroma_ms, memory_ms, recalls = [], [], []
+
+    for q_emb in q_embs:
+        t0 = time.perf_counter()
+        res = store._collection.query(query_embeddings=[q_emb], n_results=k, include=[])
+        chroma_ms.append((time.perf_counter() - t0) * 1000)
+        truth = set(res["ids"][0])
+
+        t0 = time.perf_counter()
+        hits = index.search_vector(q_emb, k=k)
+        memory_ms.append((time.perf_counter() - t0) * 1000)
+
+        got = {index.ids[row] for row, _ in hits}
+        recalls.append(len(got & truth) / max(len(truth), 1))
+
+    def _pct(xs):
+        return {"p50": float(np.percentile(xs, 50)), "p99": float(np.percentile(xs, 99))} if xs else {}
+
+    return {
+        "k": k,
+        "queries": len(queries),
+        "dtype": index.dtype,
+        "recall_at_k": float(np.mean(recalls)) if recalls else 0.0,
+        "chroma_ms": _pct(chroma_ms),
+        "memory_ms": _pct(memory_ms),
+    }
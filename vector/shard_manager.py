@@ -0,0 +1,200 @@
+import concurrent.futures
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from channels.folder_channel import FolderChannel
+from channels.sitemap_channel import SitemapChannel
+from ingestion.ingestion_manager import IngestionManager
+from utils import metrics
+from .chroma_manager import LOCAL_KB_QUERY, ChromaManager
+
+logger = logging.getLogger(__name__)
+
+# Chroma collection names: 3-63 chars, alphanumeric at both ends
+_SHARD_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{1,61}[A-Za-z0-9]$")
+
+
+def parse_sites(spec: str) -> Dict[str, str]:
+    """
+    "onsurity=https://www.onsurity.com/sitemap_index.xml,local_kb=data/insurance_docs"
+    -> {"onsurity": "https://...", "local_kb": "data/insurance_docs"}
+    """
+    sites = {}
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, source = entry.partition("=")
+        name, source = name.strip(), source.strip()
+        if not sep or not source:
+            raise ValueError(f"SITES entry must look like name=source, got {entry!r}")
+        if not _SHARD_NAME.match(name):
+            raise ValueError(f"invalid shard name {name!r}: use 3-63 chars of [A-Za-z0-9._-]")
+        sites[name] = source
+    return sites
+
+
+def channel_for(source: str, max_pages: int):
+    if source.startswith(("http://", "https://")):
+        return SitemapChannel(source, max_pages=max_pages)
+    return FolderChannel(source)
+
+
+class ShardManager:
+    """
+    One Chroma collection per site. Sites ingest independently in parallel,
+    and a query is embedded once, fanned out to the selected shards
+    concurrently and merged by relevance score.
+    """
+
+    def __init__(
+        self,
+        persist_dir,
+        embedding_model,
+        sites: Dict[str, str],
+        max_pages: int = 200,
+        memory_index_dtype: Optional[str] = None,
+        chunk_size: int = 0,
+        chunk_overlap: int = 100,
+        max_workers: Optional[int] = None,
+    ):
+        if not sites:
+            raise ValueError("ShardManager needs at least one site")
+        self.embedding_model = embedding_model
+        self.sites = dict(sites)
+        self.max_pages = max_pages
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_workers = max_workers or len(self.sites)
+
+        self.shards: Dict[str, ChromaManager] = {
+            name: ChromaManager(persist_dir, embedding_model, memory_index_dtype, collection_name=name)
+            for name in self.sites
+        }
+        self._stats: Dict[str, dict] = {
+            name: {"source": src, "queries": 0, "query_ms_total": 0.0} for name, src in self.sites.items()
+        }
+        self._stats_lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix="shard")
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.shards)
+
+    # ----------------------------
+    # Ingestion
+    # ----------------------------
+    def _ingest_one(self, name: str) -> dict:
+        shard = self.shards[name]
+        before = shard.count()
+        t0 = time.perf_counter()
+        with metrics.span("shard_ingest", shard=name):
+            IngestionManager(
+                [channel_for(self.sites[name], self.max_pages)],
+                shard,
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+            ).ingest_all()
+        return {"ingest_seconds": time.perf_counter() - t0, "ingested_records": shard.count() - before}
+
+    def ingest_all(self, names: Optional[List[str]] = None) -> Dict[str, dict]:
+        """Ingest every (or the given) shard in parallel; one failing site does not stop the others."""
+        names = names or self.names
+        results = {}
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix="ingest") as pool:
+            futures = {pool.submit(self._ingest_one, name): name for name in names}
+            for fut in concurrent.futures.as_completed(futures):
+                name = futures[fut]
+                try:
+                    results[name] = dict(fut.result(), error=None)
+                except Exception as e:
+                    logger.warning("ingest failed for shard %s: %s", name, e)
+                    metrics.inc("rag_shard_errors_total", shard=name, op="ingest")
+                    results[name] = {"error": str(e)}
+                with self._stats_lock:
+                    self._stats[name].update(results[name])
+        return results
+
+    # ----------------------------
+    # Query fan-out
+    # ----------------------------
+    def _targets(self, shards: Optional[List[str]]) -> List[str]:
+        # None means every shard; an explicit empty selection means none
+        if shards is None:
+            return self.names
+        return [s for s in shards if s in self.shards]
+
+    def _search_one(self, name: str, search_fn) -> List[Tuple[Document, float]]:
+        t0 = time.perf_counter()
+        with metrics.span("shard_search", shard=name):
+            hits = search_fn(self.shards[name])
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        with self._stats_lock:
+            self._stats[name]["queries"] += 1
+            self._stats[name]["query_ms_total"] += elapsed_ms
+        return hits
+
+    def _fan_out(self, targets: List[str], search_fn, op: str) -> List[Tuple[Document, float]]:
+        """Run search_fn(shard) on every target concurrently; merged hits, best score first."""
+        futures = {self._pool.submit(self._search_one, name, search_fn): name for name in targets}
+        merged = []
+        for fut in concurrent.futures.as_completed(futures):
+            name = futures[fut]
+            try:
+                hits = fut.result()
+            except Exception as e:
+                logger.warning("%s failed for shard %s: %s", op, name, e)
+                metrics.inc("rag_shard_errors_total", shard=name, op=op)
+                continue
+            for doc, score in hits:
+                doc.metadata["shard"] = name
+                merged.append((doc, score))
+
+        merged.sort(key=lambda x: x[1], reverse=True)
+        return merged
+
+    def search(self, query: str, k: int = 8, shards: Optional[List[str]] = None) -> List[Tuple[Document, float]]:
+        targets = self._targets(shards)
+        if not targets:
+            return []
+        q_emb = self.embedding_model.embed_query(query)
+        return self._fan_out(targets, lambda shard: shard.search_by_vector(q_emb, k=k), "search")[:k]
+
+    def search_local_only(self, shards: Optional[List[str]] = None):
+        """Same contract as ChromaManager.search_local_only, over the selected shards, merged by score."""
+        targets = self._targets(shards)
+        if not targets:
+            return []
+        q_emb = self.embedding_model.embed_query(LOCAL_KB_QUERY)
+        hits = self._fan_out(targets, lambda shard: shard.search_local_by_vector(q_emb), "search_local_only")
+        return [doc for doc, _ in hits]
+
+    def as_retriever(self, k: int = 8, shards: Optional[List[str]] = None):
+        return ShardRetriever(manager=self, k=k, shards=shards)
+
+    def stats(self) -> Dict[str, dict]:
+        out = {}
+        for name, shard in self.shards.items():
+            with self._stats_lock:
+                s = dict(self._stats[name])
+            s["records"] = shard.count()
+            s["query_ms_avg"] = s["query_ms_total"] / s["queries"] if s["queries"] else 0.0
+            out[name] = s
+        return out
+
+
+class ShardRetriever(BaseRetriever):
+    """LangChain retriever over selected shards of a ShardManager (supports `.invoke()`)."""
+
+    manager: Any
+    k: int = 8
+    shards: Optional[List[str]] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return [doc for doc, _ in self.manager.search(query, k=self.k, shards=self.shards)]